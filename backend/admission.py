@@ -0,0 +1,203 @@
+import os
+import math
+import time
+import threading
+import importlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from flask import request, g, jsonify, current_app
+
+# Contrôle d'admission: seaux de jetons par client et limite de requêtes en cours par voie.
+# Désactivé par défaut: derrière un proxy (Render, Vercel), remote_addr est celui du proxy et tous
+# les utilisateurs partageraient un seul quota sans ADMISSION_TRUST_PROXY=1
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', '0') == '1'
+ADMISSION_STORE = os.getenv('ADMISSION_STORE')  # ex. "mon_module:RedisTokenBucketStore"
+ADMISSION_TRUST_PROXY = os.getenv('ADMISSION_TRUST_PROXY', '0') == '1'
+ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', 5))
+
+# Voies de priorité: les routes coûteuses (upload, génération) ne bloquent pas les lectures
+LANES = {
+    "expensive": {
+        "rate_per_minute": float(os.getenv('ADMISSION_EXPENSIVE_RATE', 10)),
+        "burst": int(os.getenv('ADMISSION_EXPENSIVE_BURST', 5)),
+        "max_in_flight": int(os.getenv('ADMISSION_EXPENSIVE_MAX_IN_FLIGHT', 4)),
+        "queue_size": int(os.getenv('ADMISSION_EXPENSIVE_QUEUE_SIZE', 8)),
+        "queue_timeout": float(os.getenv('ADMISSION_EXPENSIVE_QUEUE_TIMEOUT', 30)),
+    },
+    "default": {
+        "rate_per_minute": float(os.getenv('ADMISSION_DEFAULT_RATE', 600)),
+        "burst": int(os.getenv('ADMISSION_DEFAULT_BURST', 100)),
+        "max_in_flight": int(os.getenv('ADMISSION_DEFAULT_MAX_IN_FLIGHT', 64)),
+        "queue_size": int(os.getenv('ADMISSION_DEFAULT_QUEUE_SIZE', 64)),
+        "queue_timeout": float(os.getenv('ADMISSION_DEFAULT_QUEUE_TIMEOUT', 5)),
+    },
+}
+
+
+class TokenBucketStore(ABC):
+    """
+    Stockage des seaux de jetons. Pour partager les quotas entre plusieurs
+    processus ou machines, implémenter consume() sur un stockage commun
+    (Redis, base de données) et le déclarer dans ADMISSION_STORE.
+    """
+
+    @abstractmethod
+    def consume(self, key, rate, capacity):
+        """Retire un jeton du seau `key`; renvoie 0 si accepté, sinon le délai d'attente en secondes"""
+
+
+class InMemoryTokenBucketStore(TokenBucketStore):
+    """Seaux de jetons en mémoire du processus, avec éviction des clients les plus anciens"""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, rate, capacity):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / rate if rate > 0 else float(ADMISSION_RETRY_AFTER)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class InFlightLimiter:
+    """Limite le nombre de requêtes en cours, avec une file d'attente bornée"""
+
+    def __init__(self, max_in_flight, queue_size, queue_timeout):
+        self.max_in_flight = max_in_flight
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Renvoie True si la requête est admise, False si elle doit être rejetée"""
+        with self._condition:
+            if self.active < self.max_in_flight:
+                self.active += 1
+                return True
+            if self.waiting >= self.queue_size:
+                return False
+
+            self.waiting += 1
+            try:
+                deadline = time.monotonic() + self.queue_timeout
+                while self.active >= self.max_in_flight:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+                self.active += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+
+def load_store():
+    """Instancie le stockage configuré dans ADMISSION_STORE, ou le stockage en mémoire par défaut"""
+    if not ADMISSION_STORE:
+        return InMemoryTokenBucketStore()
+    module_name, class_name = ADMISSION_STORE.split(':', 1)
+    store_class = getattr(importlib.import_module(module_name), class_name)
+    # Erreur au démarrage plutôt qu'à la première requête
+    if not (isinstance(store_class, type) and issubclass(store_class, TokenBucketStore)):
+        raise TypeError(f"ADMISSION_STORE doit désigner une sous-classe de TokenBucketStore: {ADMISSION_STORE}")
+    return store_class()
+
+
+_store = None
+_limiters = {
+    lane: InFlightLimiter(config["max_in_flight"], config["queue_size"], config["queue_timeout"])
+    for lane, config in LANES.items()
+}
+
+
+def set_store(store):
+    """Remplace le stockage des seaux de jetons (ex. stockage partagé entre workers)"""
+    global _store
+    _store = store
+
+
+def expensive(view):
+    """Décorateur: classe la route dans la voie des opérations coûteuses"""
+    view.admission_lane = "expensive"
+    return view
+
+
+def client_id():
+    """Identifiant du client pour les quotas (adresse IP)"""
+    if ADMISSION_TRUST_PROXY and request.headers.get('X-Forwarded-For'):
+        # Seule la dernière entrée est ajoutée par le proxy de confiance; les précédentes viennent du client
+        return request.headers['X-Forwarded-For'].split(',')[-1].strip()
+    return request.remote_addr or 'unknown'
+
+
+def _rejection(status_code, message, retry_after):
+    response = jsonify({"error": message, "retry_after": retry_after})
+    response.status_code = status_code
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def _admit():
+    if request.method == 'OPTIONS':
+        return None
+
+    view = current_app.view_functions.get(request.endpoint)
+    lane = getattr(view, 'admission_lane', 'default')
+    config = LANES[lane]
+
+    # Quota par client (429): vérifié avant de lire le corps de la requête
+    wait = _store.consume(f"{lane}:{client_id()}", config["rate_per_minute"] / 60, config["burst"])
+    if wait > 0:
+        return _rejection(429, "Trop de requêtes, réessayez plus tard", max(1, math.ceil(wait)))
+
+    # Capacité globale (503): file d'attente bornée puis délestage
+    if not _limiters[lane].acquire():
+        return _rejection(503, "Serveur surchargé, réessayez plus tard", ADMISSION_RETRY_AFTER)
+    g.admission_lane = lane
+    return None
+
+
+def _release(exception=None):
+    lane = g.pop('admission_lane', None)
+    if lane is not None:
+        _limiters[lane].release()
+
+
+def init_admission(app):
+    """Enregistre le contrôle d'admission sur l'application (désactivable avec ADMISSION_ENABLED=0)"""
+    global _store
+    if not ADMISSION_ENABLED:
+        return
+    if not ADMISSION_TRUST_PROXY:
+        print("⚠️ Attention: contrôle d'admission sans ADMISSION_TRUST_PROXY=1, "
+              "les quotas sont par adresse de connexion (un seul quota derrière un proxy)")
+    if _store is None:
+        _store = load_store()
+    app.before_request(_admit)
+    app.teardown_request(_release)
+
+
+def get_admission_status():
+    """État courant des voies (requêtes en cours et en attente)"""
+    return {
+        lane: {"active": limiter.active, "waiting": limiter.waiting, "max_in_flight": limiter.max_in_flight}
+        for lane, limiter in _limiters.items()
+    }
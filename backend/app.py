@@ -3,7 +3,12 @@ import json
 import uuid
 import re
 import datetime
-from flask import Flask, request, jsonify, send_from_directory
+import time
+import shutil
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 from pypdf import PdfReader
@@ -12,7 +17,15 @@ import io
 import google.generativeai as genai
 from dotenv import load_dotenv
 from models import FlashcardSet, Flashcard
-from db import db_session, init_db, shutdown_session
+from db import db_session, engine, init_db, shutdown_session
+from ocr import ocr_image, ocr_pdf_pages
+from export import EXPORT_FORMATS, stream_export
+from admission import init_admission, expensive, get_admission_status
+from profiling import init_profiling, is_admin_request, get_profiles, get_profile
+from prompts import (
+    plan_flashcard_calls, build_flashcard_prompt, normalize_num_cards, GenerationUsage,
+    get_usage_summary, OUTPUT_TOKEN_BUDGET
+)
 
 # Charger les variables d'environnement
 load_dotenv()
@@ -30,14 +43,33 @@ CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=False)
 # Register database session cleanup
 app.teardown_appcontext(shutdown_session)
 
+# Contrôle d'admission (quotas par client, limite de requêtes en cours, délestage)
+init_admission(app)
+
+# Profilage optionnel des requêtes (header X-Profile ou PROFILE_SAMPLE_RATE)
+init_profiling(app, engine)
+
 # Configuration
 UPLOAD_FOLDER = 'uploads'
 DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
 FLASHCARDS_FILE = os.path.join(DATA_FOLDER, 'flashcards.json')
-ALLOWED_EXTENSIONS = {'pdf'}#, 'png', 'jpg', 'jpeg', 'txt'}
+ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'tif', 'tiff', 'txt'}
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'tif', 'tiff'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload size
 
+# Traitement par lots
+BATCH_MAX_FILES = int(os.getenv('BATCH_MAX_FILES', 50))
+BATCH_MAX_UNZIPPED_SIZE = int(os.getenv('BATCH_MAX_UNZIPPED_SIZE', 100 * 1024 * 1024))  # Protection contre les zip bombs
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', 8))
+
+# Synchronisation incrémentale des sessions d'étude
+SYNC_MAX_EVENTS = int(os.getenv('SYNC_MAX_EVENTS', 5000))
+
+# Budget d'appels simultanés au modèle, partagé par toutes les requêtes (pris dans generate_flashcards_from_text)
+GENERATION_CONCURRENCY = int(os.getenv('GENERATION_CONCURRENCY', 4))
+GENERATION_SEMAPHORE = threading.BoundedSemaphore(GENERATION_CONCURRENCY)
+
 # Création des dossiers nécessaires
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(DATA_FOLDER, exist_ok=True)
@@ -61,25 +93,55 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 def extract_text_from_pdf(file_path):
-    """Extrait le texte d'un fichier PDF"""
+    """Extrait le texte d'un fichier PDF, avec repli sur l'OCR pour les pages scannées"""
     try:
         reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-        return text
+        pages_text = [page.extract_text() or "" for page in reader.pages]
+
+        # Les pages sans couche texte sont probablement des scans: on les passe à l'OCR
+        empty_pages = [i for i, page_text in enumerate(pages_text) if not page_text.strip()]
+        if empty_pages:
+            print(f"OCR de {len(empty_pages)} page(s) sans texte dans {file_path}")
+            for i, page_text in ocr_pdf_pages(file_path, empty_pages).items():
+                pages_text[i] = page_text
+
+        return "".join(page_text + "\n" for page_text in pages_text if page_text)
     except Exception as e:
         print(f"Erreur lors de l'extraction de texte du PDF: {e}")
         return ""
 
 def extract_text_from_image(file_path):
-    """
-    Pour une implémentation complète, vous pourriez utiliser une bibliothèque OCR comme pytesseract.
-    Pour l'instant, nous retournons un message placeholder.
-    """
-    return "Le texte extrait de l'image serait affiché ici. Installez pytesseract pour l'OCR."
+    """Extrait le texte d'une image (notes scannées, photos) avec l'OCR local"""
+    try:
+        return ocr_image(file_path)
+    except Exception as e:
+        print(f"Erreur lors de l'extraction de texte de l'image: {e}")
+        return ""
+
+def extract_text_from_txt(file_path):
+    """Lit un fichier texte en UTF-8, avec repli sur Latin-1 (qui décode tous les octets)"""
+    try:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        try:
+            return data.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            return data.decode('latin-1')
+    except Exception as e:
+        print(f"Erreur lors de la lecture du fichier texte: {e}")
+        return ""
+
+def extract_text_from_file(file_path):
+    """Extrait le texte d'un fichier selon son extension"""
+    file_ext = file_path.rsplit('.', 1)[1].lower()
+
+    if file_ext == 'pdf':
+        return extract_text_from_pdf(file_path)
+    elif file_ext in IMAGE_EXTENSIONS:
+        return extract_text_from_image(file_path)
+    elif file_ext == 'txt':
+        return extract_text_from_txt(file_path)
+    return ""
 
 def estimate_card_difficulty(question, answer):
     """
@@ -129,100 +191,87 @@ def estimate_card_difficulty(question, answer):
     
     return difficulty_score
 
-def generate_flashcards_from_text(text, num_cards=5):
+def parse_flashcards_response(ai_response):
+    """Extrait le tableau JSON de flashcards d'une réponse de Gemini; renvoie None en cas d'échec"""
+    # Essayer d'abord le parsing direct (si Gemini a bien retourné juste du JSON)
+    try:
+        flashcards = json.loads(ai_response)
+        print("Parsing direct JSON réussi")
+        return flashcards
+    except json.JSONDecodeError:
+        pass
+
+    # Nettoyer la réponse avec différents patterns
+    patterns = [
+        r'```json\s*(\[.*?\])\s*```',  # Format code JSON
+        r'```\s*(\[.*?\])\s*```',       # Format code générique
+        r'(\[\s*\{.*?\}\s*\])'          # Format tableau JSON brut
+    ]
+
+    for pattern in patterns:
+        match = re.search(pattern, ai_response, re.DOTALL)
+        if match:
+            try:
+                flashcards = json.loads(match.group(1))
+                print(f"Parsing JSON réussi avec le pattern: {pattern}")
+                return flashcards
+            except json.JSONDecodeError:
+                continue
+
+    print(f"Aucun pattern JSON n'a fonctionné. Réponse brute: {ai_response[:200]}")
+    return None
+
+def generate_flashcards_from_text(text, num_cards=5, label=None):
     """Génère des flashcards à partir du texte en utilisant Gemini"""
+    num_cards = normalize_num_cards(num_cards)
     try:
         if not GEMINI_API_KEY:
             print("Pas de clé API Gemini configurée")
             return generate_default_flashcards(text, num_cards)
         
-        # Limitation à 4000 caractères pour éviter des demandes trop grandes
-        text_to_process = text[:4000] if len(text) > 4000 else text
-        
         # Créer le modèle Gemini
         model = genai.GenerativeModel(model_name='gemini-2.0-flash')
         
-        # Tester la connexion API avant de continuer
-        try:
-            test_response = model.generate_content("Test API")
-            print("Connexion à l'API Gemini établie")
-        except Exception as e:
-            print(f"Erreur de connexion à l'API Gemini: {e}")
-            return generate_default_flashcards(text, num_cards)
-        
-        # Construire le prompt pour Gemini
-        prompt = f"""À partir du texte suivant, crée {num_cards} cartes d'apprentissage (flashcards) au format question-réponse.
-
-TEXTE À ANALYSER:
-{text_to_process}
-
-INSTRUCTIONS:
-1. Identifie les concepts clés et les informations importantes dans le texte.
-2. Crée exactement {num_cards} cartes avec des questions pertinentes et des réponses précises.
-3. Les questions doivent être claires et spécifiques.
-4. Les réponses doivent être concises mais complètes.
-5. Attribue un niveau de difficulté à chaque carte sur une échelle de 1 à 5 où:
-   - 1 = Très facile (connaissances de base)
-   - 2 = Facile (rappel simple)
-   - 3 = Moyenne (compréhension requise)
-   - 4 = Difficile (application de concepts)
-   - 5 = Très difficile (analyse ou synthèse complexe)
-6. Ta réponse doit être un tableau JSON valide au format suivant:
-
-[
-  {{
-    "question": "Question 1?",
-    "answer": "Réponse 1",
-    "difficulty": 2
-  }},
-  {{
-    "question": "Question 2?",
-    "answer": "Réponse 2",
-    "difficulty": 4
-  }}
-]
-
-Réponds UNIQUEMENT avec le JSON, sans texte explicatif avant ou après."""
-
-        # Faire la requête à l'API Gemini
-        response = model.generate_content(prompt)
-        
-        # Extraire la réponse
-        ai_response = response.text
+        # Répartir la génération dans les budgets de tokens (plusieurs appels si nécessaire)
+        calls = plan_flashcard_calls(text, num_cards)
+        usage = GenerationUsage(label)
         
-        # Debug: imprimer la réponse brute pour voir son format réel
-        print(f"Réponse brute de Gemini (premiers 200 caractères): {ai_response[:200]}")
-        
-        # Traiter la réponse pour extraire le JSON
+        flashcards = []
+        used_contexts = set()
         try:
-            # Essayer d'abord le parsing direct (si Gemini a bien retourné juste du JSON)
-            try:
-                flashcards = json.loads(ai_response)
-                print("Parsing direct JSON réussi")
-            except json.JSONDecodeError:
-                # Nettoyer la réponse avec différents patterns
-                clean_response = None
-                patterns = [
-                    r'```json\s*(\[.*?\])\s*```',  # Format code JSON
-                    r'```\s*(\[.*?\])\s*```',       # Format code générique
-                    r'(\[\s*\{.*?\}\s*\])'          # Format tableau JSON brut
-                ]
+            for context, count in calls:
+                # Les appels qui partagent le même texte reçoivent les questions déjà créées
+                existing_questions = [card.get("question", "") for card in flashcards] if context in used_contexts else ()
+                used_contexts.add(context)
+                prompt = build_flashcard_prompt(context, count, existing_questions)
                 
-                for pattern in patterns:
-                    match = re.search(pattern, ai_response, re.DOTALL)
-                    if match:
-                        try:
-                            clean_response = match.group(1)
-                            flashcards = json.loads(clean_response)
-                            print(f"Parsing JSON réussi avec le pattern: {pattern}")
-                            break
-                        except json.JSONDecodeError:
-                            continue
+                # Faire la requête à l'API Gemini dans le budget d'appels simultanés
+                with GENERATION_SEMAPHORE:
+                    started = time.perf_counter()
+                    response = model.generate_content(
+                        prompt,
+                        generation_config={"max_output_tokens": OUTPUT_TOKEN_BUDGET}
+                    )
+                    usage.record_call(prompt, response, time.perf_counter() - started)
                 
-                if clean_response is None:
-                    print(f"Aucun pattern JSON n'a fonctionné. Réponse brute: {ai_response[:200]}")
-                    return generate_default_flashcards(text, num_cards)
-            
+                # Extraire la réponse
+                ai_response = response.text
+                
+                # Debug: imprimer la réponse brute pour voir son format réel
+                print(f"Réponse brute de Gemini (premiers 200 caractères): {ai_response[:200]}")
+                
+                cards = parse_flashcards_response(ai_response)
+                if cards is None:
+                    continue
+                flashcards.extend(cards[:count])
+        finally:
+            usage.finish()
+        
+        if not flashcards:
+            return generate_default_flashcards(text, num_cards)
+        
+        # Traiter les cartes retournées
+        try:
             # Ajouter des IDs uniques à chaque flashcard
             for card in flashcards:
                 card["id"] = str(uuid.uuid4())
@@ -241,7 +290,6 @@ Réponds UNIQUEMENT avec le JSON, sans texte explicatif avant ou après."""
         
         except Exception as e:
             print(f"Erreur lors du traitement de la réponse JSON: {e}")
-            print(f"Réponse brute complète de Gemini: {ai_response}")
             return generate_default_flashcards(text, num_cards)
         
     except Exception as e:
@@ -300,9 +348,14 @@ def test_gemini_api():
     if not GEMINI_API_KEY:
         return {"success": False, "message": "Pas de clé API configurée"}
 
+    # L'appel de test consomme du quota: il est comptabilisé comme les générations
+    prompt = "Dis bonjour en français"
+    usage = GenerationUsage("test-gemini")
+    started = time.perf_counter()
+    response = None
     try:
         model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content("Dis bonjour en français")
+        response = model.generate_content(prompt)
         return {
             "success": True,
             "message": f"Test API Gemini réussi: {response.text}",
@@ -314,6 +367,51 @@ def test_gemini_api():
             "message": f"Erreur lors du test de l'API Gemini: {str(e)}",
             "error": str(e)
         }
+    finally:
+        usage.record_call(prompt, response, time.perf_counter() - started)
+        usage.finish()
+
+def bump_set_version(flashcard_set, cards=()):
+    """Incrémente le compteur de modifications du jeu et y rattache les cartes modifiées"""
+    # Incrément en SQL: la ligne du jeu reste verrouillée jusqu'au commit
+    flashcard_set.version = FlashcardSet.version + 1
+    db_session.flush()
+    version = flashcard_set.version
+    for card in cards:
+        card.updated_version = version
+    return version
+
+def _parse_event_int(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"Entier attendu: {value!r}")
+    return value
+
+def _parse_event_datetime(value):
+    return datetime.datetime.fromisoformat(value) if value else None
+
+def parse_review_event(event):
+    """Valide un événement de révision et renvoie les champs à appliquer; lève ValueError/TypeError"""
+    parsers = {
+        "lastReviewed": ("last_reviewed", _parse_event_datetime),
+        "nextReview": ("next_review", _parse_event_datetime),
+        "reviewCount": ("review_count", _parse_event_int),
+        "difficulty": ("difficulty", _parse_event_int),
+    }
+    return {column: parse(event[key]) for key, (column, parse) in parsers.items() if key in event}
+
+def serialize_card_delta(card):
+    """Représentation compacte d'une carte pour la synchronisation (champs vides omis)"""
+    data = {
+        "id": card.id,
+        "question": card.question,
+        "answer": card.answer,
+        "tags": card.tags or None,
+        "difficulty": card.difficulty,
+        "lastReviewed": card.last_reviewed.isoformat() if card.last_reviewed else None,
+        "nextReview": card.next_review.isoformat() if card.next_review else None,
+        "reviewCount": card.review_count or None
+    }
+    return {key: value for key, value in data.items() if value is not None}
 
 @app.route('/')
 def index():
@@ -330,7 +428,42 @@ def test_gemini():
     result = test_gemini_api()
     return jsonify(result), 200 if result.get("success", False) else 500
 
+@app.route('/api/metrics/generation')
+def generation_metrics():
+    """Route admin: consommation de tokens et latence des générations récentes (les libellés contiennent les noms de fichiers)"""
+    if not is_admin_request():
+        return jsonify({"error": "Accès refusé"}), 403
+    return jsonify(get_usage_summary()), 200
+
+@app.route('/api/admin/admission')
+def admission_status():
+    """Route admin: occupation des voies du contrôle d'admission"""
+    if not is_admin_request():
+        return jsonify({"error": "Accès refusé"}), 403
+    return jsonify(get_admission_status()), 200
+
+@app.route('/api/admin/profiles')
+def list_profiles():
+    """Route admin: requêtes profilées les plus lentes avec leurs requêtes SQL"""
+    if not is_admin_request():
+        return jsonify({"error": "Accès refusé"}), 403
+    limit = request.args.get('limit', default=20, type=int)
+    return jsonify(get_profiles(limit)), 200
+
+@app.route('/api/admin/profiles/<profile_id>')
+def get_request_profile(profile_id):
+    """Route admin: détail d'un profil; ?format=collapsed renvoie les piles pour un flame graph"""
+    if not is_admin_request():
+        return jsonify({"error": "Accès refusé"}), 403
+    profile = get_profile(profile_id)
+    if profile is None:
+        return jsonify({"error": "Profil non trouvé", "profileId": profile_id}), 404
+    if request.args.get('format') == 'collapsed':
+        return profile["collapsed"], 200, {"Content-Type": "text/plain; charset=utf-8"}
+    return jsonify(profile), 200
+
 @app.route('/api/upload', methods=['POST'])
+@expensive
 def upload_file():
     """Route pour télécharger un fichier et générer des flashcards"""
     # Vérifier si la requête contient le fichier
@@ -349,28 +482,13 @@ def upload_file():
         file.save(file_path)
         
         # Extraction du texte selon le type de fichier
-        file_ext = filename.rsplit('.', 1)[1].lower()
-        text = ""
-        
-        if file_ext == 'pdf':
-            text = extract_text_from_pdf(file_path)
-        elif file_ext in ['png', 'jpg', 'jpeg']:
-            text = extract_text_from_image(file_path)
-        elif file_ext == 'txt':
-            with open(file_path, 'r', encoding='utf-8') as f:
-                text = f.read()
-        
-        # Obtenir le nombre de cartes demandé (paramètre optionnel)
-        num_cards = request.args.get('num_cards', default=5, type=int)
+        text = extract_text_from_file(file_path)
         
-        # Test de l'API Gemini avant génération
-        gemini_status = test_gemini_api()
-        if not gemini_status.get("success", False):
-            # Si le test échoue, on continue quand même mais on informe l'utilisateur
-            print("Test API Gemini échoué, utilisation du générateur par défaut")
+        # Obtenir le nombre de cartes demandé (paramètre optionnel, borné par MAX_NUM_CARDS)
+        num_cards = normalize_num_cards(request.args.get('num_cards', default=5, type=int))
         
         # Génération des flashcards à partir du texte extrait
-        flashcards = generate_flashcards_from_text(text, num_cards)
+        flashcards = generate_flashcards_from_text(text, num_cards, label=f"upload:{filename}")
         
         # Vérifier si nous avons des flashcards générées par Gemini ou par défaut
         is_default = any("générée automatiquement" in card.get("question", "") for card in flashcards)
@@ -418,6 +536,154 @@ def upload_file():
     
     return jsonify({"error": "Type de fichier non autorisé"}), 400
 
+class BatchTooLargeError(Exception):
+    """Le lot dépasse BATCH_MAX_FILES documents"""
+
+def save_zip_entries(file, batch_folder, start_index):
+    """Extrait les fichiers autorisés d'une archive zip; renvoie les documents et les rejets"""
+    documents, rejected = [], []
+    total_size = 0
+
+    with zipfile.ZipFile(file.stream) as archive:
+        for entry in archive.infolist():
+            name = os.path.basename(entry.filename)
+            if entry.is_dir() or not name or entry.filename.startswith('__MACOSX/'):
+                continue
+
+            filename = secure_filename(name)
+            if not allowed_file(filename) or filename.rsplit('.', 1)[1].lower() == 'zip':
+                rejected.append({"filename": name, "status": "rejected", "error": "Type de fichier non autorisé"})
+                continue
+
+            # Limite vérifiée avant d'écrire: un lot trop grand n'atteint jamais le disque en entier
+            if start_index + len(documents) >= BATCH_MAX_FILES:
+                raise BatchTooLargeError()
+
+            total_size += entry.file_size
+            if total_size > BATCH_MAX_UNZIPPED_SIZE:
+                raise ValueError("Archive trop volumineuse une fois décompressée")
+
+            file_path = os.path.join(batch_folder, f"{start_index + len(documents)}_{filename}")
+            with archive.open(entry) as source, open(file_path, 'wb') as target:
+                shutil.copyfileobj(source, target)
+            documents.append({"filename": filename, "path": file_path})
+
+    return documents, rejected
+
+def process_batch_document(document, num_cards):
+    """Extrait le texte d'un document du lot et génère ses flashcards"""
+    text = extract_text_from_file(document["path"])
+    if not text.strip():
+        raise ValueError("Aucun texte n'a pu être extrait du fichier")
+
+    return generate_flashcards_from_text(text, num_cards, label=f"batch:{document['filename']}")
+
+@app.route('/api/upload/batch', methods=['POST'])
+@expensive
+def upload_batch():
+    """Route pour télécharger plusieurs fichiers (ou une archive zip) et générer un jeu par document"""
+    uploads = [file for file in request.files.getlist('files') + request.files.getlist('file') if file.filename]
+    if not uploads:
+        return jsonify({"error": "Aucun fichier dans la requête"}), 400
+
+    num_cards = normalize_num_cards(request.args.get('num_cards', default=5, type=int))
+
+    batch_id = str(uuid.uuid4())
+    batch_folder = os.path.join(app.config['UPLOAD_FOLDER'], batch_id)
+    os.makedirs(batch_folder, exist_ok=True)
+
+    # Les fichiers du lot ne servent qu'au traitement: le dossier est supprimé ensuite
+    try:
+        return process_batch(uploads, num_cards, batch_id, batch_folder)
+    except BatchTooLargeError:
+        return jsonify({"error": f"Trop de fichiers dans le lot (maximum {BATCH_MAX_FILES})"}), 400
+    finally:
+        shutil.rmtree(batch_folder, ignore_errors=True)
+
+def process_batch(uploads, num_cards, batch_id, batch_folder):
+    """Enregistre les fichiers du lot dans batch_folder, génère un jeu par document et renvoie la réponse"""
+    # Enregistrement des fichiers (les archives zip sont dépliées)
+    documents, results = [], []
+    for file in uploads:
+        filename = secure_filename(file.filename)
+        if filename.lower().endswith('.zip'):
+            try:
+                entries, rejected = save_zip_entries(file, batch_folder, len(documents))
+            except (zipfile.BadZipFile, ValueError) as e:
+                results.append({"filename": filename, "status": "rejected", "error": str(e)})
+                continue
+            documents.extend(entries)
+            results.extend(rejected)
+        elif filename and allowed_file(filename):
+            if len(documents) >= BATCH_MAX_FILES:
+                raise BatchTooLargeError()
+            file_path = os.path.join(batch_folder, f"{len(documents)}_{filename}")
+            file.save(file_path)
+            documents.append({"filename": filename, "path": file_path})
+        else:
+            results.append({"filename": file.filename, "status": "rejected", "error": "Type de fichier non autorisé"})
+
+    if not documents:
+        return jsonify({"success": False, "batch_id": batch_id, "results": results}), 400
+
+    # Extraction et génération en parallèle: la durée totale suit le document le plus lent
+    flashcard_sets, generated = [], []
+    with ThreadPoolExecutor(max_workers=min(BATCH_WORKERS, len(documents))) as executor:
+        futures = {executor.submit(process_batch_document, document, num_cards): document for document in documents}
+        for future in as_completed(futures):
+            document = futures[future]
+            try:
+                flashcards = future.result()
+            except Exception as e:
+                print(f"Erreur lors du traitement de {document['filename']}: {e}")
+                results.append({"filename": document["filename"], "status": "error", "error": str(e)})
+                continue
+
+            set_id = str(uuid.uuid4())
+            flashcard_set = FlashcardSet(
+                id=set_id,
+                title=document["filename"].rsplit('.', 1)[0],
+                source=document["filename"],
+                creation_date=datetime.datetime.now()
+            )
+            for card_data in flashcards:
+                flashcard_set.flashcards.append(Flashcard(
+                    id=card_data['id'],
+                    question=card_data['question'],
+                    answer=card_data['answer'],
+                    tags=card_data.get('tags', []),
+                    difficulty=card_data['difficulty']
+                ))
+            flashcard_sets.append(flashcard_set)
+            generated.append({
+                "filename": document["filename"],
+                "status": "success",
+                "set_id": set_id,
+                "count": len(flashcards),
+                "flashcards": flashcards
+            })
+
+    # Écriture de tous les jeux dans une seule transaction
+    if flashcard_sets:
+        try:
+            db_session.add_all(flashcard_sets)
+            db_session.commit()
+        except Exception as e:
+            db_session.rollback()
+            return jsonify({"error": f"Database error: {str(e)}", "batch_id": batch_id}), 500
+
+    results = generated + results
+    failed = sum(1 for result in results if result["status"] != "success")
+    status_code = 200 if not failed else (207 if generated else 422)
+
+    return jsonify({
+        "success": not failed,
+        "batch_id": batch_id,
+        "processed": len(generated),
+        "failed": failed,
+        "results": results
+    }), status_code
+
 @app.route('/api/flashcards', methods=['GET'])
 def get_all_flashcard_sets():
     """Récupérer tous les jeux de flashcards"""
@@ -445,6 +711,7 @@ def get_flashcard_set(set_id):
             "title": flashcard_set.title,
             "source": flashcard_set.source,
             "creation_date": flashcard_set.creation_date.isoformat() if flashcard_set.creation_date else None,
+            "version": flashcard_set.version,
             "flashcards": [{
                 "id": card.id,
                 "question": card.question,
@@ -473,6 +740,7 @@ def update_flashcard_set(set_id):
     if "title" in data:
         flashcard_set.title = data["title"]
     
+    updated_cards = []
     if "flashcards" in data and isinstance(data["flashcards"], list):
         # This is a more complex update that would need to match flashcards by ID
         for card_data in data["flashcards"]:
@@ -494,9 +762,11 @@ def update_flashcard_set(set_id):
                             card.review_count = card_data["reviewCount"]
                         if "tags" in card_data:
                             card.tags = card_data["tags"]
+                        updated_cards.append(card)
                         break
     
     try:
+        bump_set_version(flashcard_set, updated_cards)
         db_session.commit()
     except Exception as e:
         db_session.rollback()
@@ -541,6 +811,7 @@ def update_flashcard(set_id, card_id):
             card.tags = data["tags"]
     
         try:
+            bump_set_version(flashcard_set, [card])
             db_session.commit()
         except Exception as e:
             db_session.rollback()
@@ -566,6 +837,120 @@ def update_flashcard(set_id, card_id):
         db_session.rollback()
         return jsonify({"error": f"Database error: {str(e)}", "setId": set_id}), 500
 
+@app.route('/api/flashcards/<set_id>/sync', methods=['POST'])
+def sync_flashcard_set(set_id):
+    """
+    Synchronisation incrémentale d'une session d'étude.
+    Le client envoie ses événements de révision et la dernière version vue;
+    le serveur les applique dans une seule transaction et renvoie uniquement
+    les cartes modifiées depuis cette version.
+    """
+    data = request.json
+    if not isinstance(data, dict):
+        return jsonify({"error": "Corps de requête invalide", "setId": set_id}), 400
+    since = data.get("since")
+    events = data.get("events") or []
+
+    if since is not None and (isinstance(since, bool) or not isinstance(since, int) or since < 0):
+        return jsonify({"error": "Version invalide", "setId": set_id}), 400
+    if not isinstance(events, list) or len(events) > SYNC_MAX_EVENTS:
+        return jsonify({"error": f"Événements invalides (maximum {SYNC_MAX_EVENTS})", "setId": set_id}), 400
+    if not all(isinstance(event, dict) and isinstance(event.get("id"), str) for event in events):
+        return jsonify({"error": "Chaque événement doit être un objet avec un id de carte", "setId": set_id}), 400
+
+    # Validation complète de chaque événement avant toute écriture
+    rejected = []
+    updates = []
+    for event in events:
+        try:
+            updates.append((event["id"], parse_review_event(event)))
+        except (TypeError, ValueError):
+            rejected.append(event["id"])
+
+    try:
+        flashcard_set = db_session.query(FlashcardSet).get(set_id)
+        if not flashcard_set:
+            return jsonify({"error": "Jeu de flashcards non trouvé", "setId": set_id}), 404
+
+        # Version inconnue (premier chargement ou base réinitialisée): envoi complet
+        full = since is None or since > flashcard_set.version
+
+        # Version attribuée aux changements de ce client; réservée avant de lire le delta
+        # pour qu'aucune modification concurrente ne soit manquée
+        version = bump_set_version(flashcard_set) if updates else flashcard_set.version
+
+        # Cartes modifiées par d'autres depuis `since`, lues avant d'appliquer les événements:
+        # les cartes que seul ce client a modifiées n'y figurent pas
+        delta_query = db_session.query(Flashcard).filter(Flashcard.set_id == set_id)
+        if not full:
+            delta_query = delta_query.filter(Flashcard.updated_version > since)
+        delta = delta_query.all()
+
+        # Application des événements de révision
+        if updates:
+            cards = {
+                card.id: card
+                for card in db_session.query(Flashcard).filter(
+                    Flashcard.set_id == set_id, Flashcard.id.in_({card_id for card_id, _ in updates})
+                )
+            }
+            for card_id, fields in updates:
+                card = cards.get(card_id)
+                if card is None:
+                    rejected.append(card_id)
+                    continue
+                for name, value in fields.items():
+                    setattr(card, name, value)
+                card.updated_version = version
+
+        # Sérialisation avant le commit, qui expirerait les objets chargés
+        changed = [serialize_card_delta(card) for card in delta]
+
+        db_session.commit()
+    except Exception as e:
+        db_session.rollback()
+        return jsonify({"error": f"Database error: {str(e)}", "setId": set_id}), 500
+
+    response = {"version": version, "cards": changed}
+    if full:
+        response["full"] = True
+    if rejected:
+        response["rejected"] = rejected
+    return jsonify(response), 200
+
+def export_response(export_format, filename, set_id=None):
+    """Réponse d'export en streaming, compressée en gzip si le client l'accepte"""
+    compress = 'gzip' in request.accept_encodings
+    body = stream_with_context(stream_export(db_session, export_format, set_id=set_id, compress=compress))
+    response = Response(body, mimetype=EXPORT_FORMATS[export_format]["mimetype"])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{EXPORT_FORMATS[export_format]["extension"]}"'
+    response.headers['Vary'] = 'Accept-Encoding'
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+@app.route('/api/flashcards/<set_id>/export', methods=['GET'])
+def export_flashcard_set(set_id):
+    """Exporter un jeu de flashcards (format: csv, ndjson ou anki)"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"Format d'export inconnu (formats: {', '.join(EXPORT_FORMATS)})"}), 400
+
+    title = db_session.query(FlashcardSet.title).filter(FlashcardSet.id == set_id).scalar()
+    if title is None:
+        return jsonify({"error": "Jeu de flashcards non trouvé", "setId": set_id}), 404
+
+    return export_response(export_format, secure_filename(title) or set_id, set_id=set_id)
+
+@app.route('/api/export', methods=['GET'])
+def export_library():
+    """Exporter toute la bibliothèque de flashcards (format: csv, ndjson ou anki)"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"Format d'export inconnu (formats: {', '.join(EXPORT_FORMATS)})"}), 400
+
+    return export_response(export_format, "brainboost-library")
+
 @app.route('/api/flashcards/<set_id>', methods=['DELETE'])
 def delete_flashcard_set(set_id):
     flashcard_set = db_session.query(FlashcardSet).get(set_id)
@@ -585,6 +970,7 @@ def delete_flashcard_set(set_id):
     }), 200
 
 @app.route('/api/generate', methods=['POST'])
+@expensive
 def generate_from_text():
     """Générer des flashcards à partir d'un texte fourni directement"""
     data = request.json
@@ -593,7 +979,7 @@ def generate_from_text():
         return jsonify({"error": "Aucun texte fourni"}), 400
     
     text = data["text"]
-    num_cards = data.get("num_cards", 5)
+    num_cards = normalize_num_cards(data.get("num_cards", 5))
     title = data.get("title", "Flashcards générées")
     
     # Test de l'API Gemini avant génération
@@ -607,7 +993,7 @@ def generate_from_text():
         }), 200  # Return 200 to show it worked, but with error info
     
     # Génération des flashcards
-    flashcards_data = generate_flashcards_from_text(text, num_cards)
+    flashcards_data = generate_flashcards_from_text(text, num_cards, label="generate")
     
     # Vérifier si nous avons des flashcards générées par Gemini ou par défaut
     is_default = any("générée automatiquement" in card.get("question", "") for card in flashcards_data)
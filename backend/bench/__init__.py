@@ -0,0 +1,7 @@
+"""
+Suite de benchmarks de l'API BrainBoost.
+
+Usage (depuis le dossier backend):
+    python -m bench                       # mesure et compare à la baseline (échoue sans baseline comparable)
+    python -m bench --update-baseline     # enregistre les résultats comme nouvelle baseline
+"""
@@ -0,0 +1,98 @@
+import re
+import json
+import time
+
+
+class FakeResponse:
+    """Réponse minimale compatible avec celles de google.generativeai"""
+
+    def __init__(self, text):
+        self.text = text
+        self.usage_metadata = None
+
+
+class FakeGenerativeModel:
+    """Remplace genai.GenerativeModel: répond en JSON valide après une latence fixe"""
+
+    latency = 0.0
+
+    def __init__(self, model_name=None, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        time.sleep(self.latency)
+        match = re.search(r"crée (\d+) cartes", prompt)
+        if not match:
+            return FakeResponse("Bonjour")
+
+        num_cards = int(match.group(1))
+        cards = [{
+            "question": f"Question de benchmark {i + 1}?",
+            "answer": f"Réponse de benchmark {i + 1} avec quelques mots de contexte.",
+            "difficulty": i % 5 + 1
+        } for i in range(num_cards)]
+        return FakeResponse(json.dumps(cards, ensure_ascii=False))
+
+
+def _escape_pdf_text(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def make_pdf(pages):
+    """Construit un PDF texte minimal (une chaîne de caractères par page), sans dépendance externe"""
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = len(objects) + 1 + 2 * len(pages)
+    page_ids = []
+    for page_text in pages:
+        lines = [line for line in page_text.splitlines() if line] or [""]
+        stream = "BT /F1 11 Tf 14 TL 50 800 Td " + " ".join(
+            f"({_escape_pdf_text(line)}) '" for line in lines
+        ) + " ET"
+        stream = stream.encode('latin-1', errors='replace')
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font_id, content_id)
+        ))
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    add(b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids))
+    catalog_id = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref_offset
+    )
+    return bytes(output)
+
+
+SAMPLE_SENTENCES = [
+    "La photosynthèse convertit l'énergie lumineuse en énergie chimique.",
+    "Le théorème de Pythagore relie les côtés d'un triangle rectangle.",
+    "La Révolution française débute en 1789 avec la prise de la Bastille.",
+    "Le protocole HTTP repose sur un modèle requête-réponse sans état.",
+    "Les mitochondries produisent l'ATP nécessaire à la cellule.",
+]
+
+
+def make_document(num_pages=3, lines_per_page=40):
+    """PDF synthétique de plusieurs pages remplies de phrases de cours"""
+    pages = []
+    for page in range(num_pages):
+        lines = [SAMPLE_SENTENCES[(page + i) % len(SAMPLE_SENTENCES)] for i in range(lines_per_page)]
+        pages.append("\n".join(lines))
+    return make_pdf(pages)
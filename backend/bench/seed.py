@@ -0,0 +1,66 @@
+import uuid
+import datetime
+from sqlalchemy import insert, delete
+from models import FlashcardSet, Flashcard
+
+# Taille des lots d'insertion pour garder une mémoire stable sur les gros jeux
+INSERT_CHUNK_SIZE = 5000
+
+
+def _card_rows(set_id, set_index, cards_per_set, card_ids):
+    for card_index in range(cards_per_set):
+        card_id = str(uuid.uuid4())
+        card_ids.append(card_id)
+        yield {
+            "id": card_id,
+            "set_id": set_id,
+            "question": f"Question {card_index + 1} du jeu {set_index + 1}?",
+            "answer": f"Réponse {card_index + 1}, suffisamment longue pour ressembler à une vraie carte.",
+            "tags": ["bench"],
+            "difficulty": card_index % 5 + 1,
+            "review_count": 0,
+            "updated_version": 0
+        }
+
+
+def seed_database(session, num_sets, cards_per_set):
+    """Remplit la base avec des jeux synthétiques; renvoie {set_id: [card_ids]}"""
+    now = datetime.datetime.now()
+    seeded = {}
+
+    for set_index in range(num_sets):
+        set_id = str(uuid.uuid4())
+        session.execute(insert(FlashcardSet), [{
+            "id": set_id,
+            "title": f"Jeu de benchmark {set_index + 1}",
+            "source": "bench",
+            "creation_date": now,
+            "version": 0
+        }])
+        seeded[set_id] = []
+
+        # Les lignes sont produites par lot: seuls les identifiants restent en mémoire
+        rows = _card_rows(set_id, set_index, cards_per_set, seeded[set_id])
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= INSERT_CHUNK_SIZE:
+                session.execute(insert(Flashcard), chunk)
+                chunk = []
+        if chunk:
+            session.execute(insert(Flashcard), chunk)
+
+    session.commit()
+    return seeded
+
+
+def database_is_empty(session):
+    """Indique si la base ne contient aucun jeu (condition pour lancer le benchmark sur une base fournie)"""
+    return session.query(FlashcardSet.id).first() is None
+
+
+def clear_database(session):
+    """Supprime toutes les cartes et tous les jeux, y compris ceux créés pendant les mesures"""
+    session.execute(delete(Flashcard))
+    session.execute(delete(FlashcardSet))
+    session.commit()
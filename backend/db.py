@@ -16,8 +16,9 @@ engine = create_engine(db_url)
 db_session = scoped_session(sessionmaker(bind=engine))
 
 def init_db():
-    from models import Base
+    from models import Base, upgrade_schema
     Base.metadata.create_all(engine)
+    upgrade_schema(engine)
 
 def shutdown_session(exception=None):
     db_session.remove()
@@ -0,0 +1,139 @@
+import io
+import os
+import csv
+import html
+import json
+import zlib
+from models import FlashcardSet, Flashcard
+
+# Taille des lots lus via le curseur serveur et des morceaux envoyés au client
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+EXPORT_FORMATS = {
+    "csv": {"mimetype": "text/csv", "extension": "csv"},
+    "ndjson": {"mimetype": "application/x-ndjson", "extension": "ndjson"},
+    # Format texte importable dans Anki (Fichier > Importer), en-têtes inclus
+    "anki": {"mimetype": "text/tab-separated-values", "extension": "txt"},
+}
+
+CSV_COLUMNS = [
+    "set_id", "set_title", "id", "question", "answer", "tags",
+    "difficulty", "lastReviewed", "nextReview", "reviewCount"
+]
+
+
+def _iter_rows(session, set_id=None):
+    """Parcourt les cartes par lots via un curseur serveur, sans charger d'objets ORM"""
+    query = session.query(
+        FlashcardSet.id, FlashcardSet.title, Flashcard.id, Flashcard.question, Flashcard.answer,
+        Flashcard.tags, Flashcard.difficulty, Flashcard.last_reviewed, Flashcard.next_review,
+        Flashcard.review_count
+    ).join(Flashcard.flashcard_set)
+    if set_id is not None:
+        query = query.filter(Flashcard.set_id == set_id)
+    return query.order_by(Flashcard.set_id).yield_per(EXPORT_BATCH_SIZE)
+
+
+def _card_dict(row):
+    set_id, set_title, card_id, question, answer, tags, difficulty, last_reviewed, next_review, review_count = row
+    return {
+        "set_id": set_id,
+        "set_title": set_title,
+        "id": card_id,
+        "question": question,
+        "answer": answer,
+        "tags": tags or [],
+        "difficulty": difficulty,
+        "lastReviewed": last_reviewed.isoformat() if last_reviewed else None,
+        "nextReview": next_review.isoformat() if next_review else None,
+        "reviewCount": review_count or 0
+    }
+
+
+def _csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    # En-tête envoyé seul: un export vide reste un CSV valide
+    writer.writerow(CSV_COLUMNS)
+    yield flush()
+    for row in rows:
+        card = _card_dict(row)
+        card["tags"] = " ".join(card["tags"])
+        writer.writerow([card[column] for column in CSV_COLUMNS])
+        yield flush()
+
+
+def _ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(_card_dict(row), ensure_ascii=False) + "\n"
+
+
+def _anki_field(value):
+    # Champs de la note interprétés comme du HTML (#html:true): échapper avant d'insérer les <br>
+    value = html.escape(str(value), quote=False)
+    return value.replace("\t", " ").replace("\r\n", "<br>").replace("\n", "<br>")
+
+
+def _anki_text(value):
+    # Paquet et étiquettes sont du texte brut; le format d'Anki n'y accepte ni tabulation ni retour à la ligne
+    return " ".join(str(value).split())
+
+
+def _anki_lines(rows):
+    yield "#separator:tab\n#html:true\n#notetype:Basic\n#deck column:3\n#tags column:4\n"
+    # Anki lit un champ qui commence par un guillemet comme un champ entre guillemets:
+    # le module csv met ces champs entre guillemets et double les guillemets internes
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter="\t", lineterminator="\n")
+    for row in rows:
+        card = _card_dict(row)
+        tags = " ".join(_anki_text(tag).replace(" ", "_") for tag in card["tags"])
+        writer.writerow([
+            _anki_field(card["question"]),
+            _anki_field(card["answer"]),
+            _anki_text(f"BrainBoost::{card['set_title']}"),
+            tags
+        ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+_WRITERS = {
+    "csv": _csv_lines,
+    "ndjson": _ndjson_lines,
+    "anki": _anki_lines,
+}
+
+
+def stream_export(session, export_format, set_id=None, compress=False):
+    """Génère l'export par morceaux d'environ EXPORT_CHUNK_SIZE octets, éventuellement compressés en gzip"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    pending, pending_size = [], 0
+
+    def emit(data):
+        data = data.encode('utf-8')
+        return compressor.compress(data) if compressor else data
+
+    for line in _WRITERS[export_format](_iter_rows(session, set_id)):
+        pending.append(line)
+        pending_size += len(line)
+        if pending_size >= EXPORT_CHUNK_SIZE:
+            chunk = emit("".join(pending))
+            pending, pending_size = [], 0
+            if chunk:
+                yield chunk
+
+    tail = emit("".join(pending))
+    if compressor:
+        tail += compressor.flush()
+    if tail:
+        yield tail
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, JSON
+from sqlalchemy import create_engine, inspect, text, Column, Integer, String, Text, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 import os
@@ -13,6 +13,8 @@ class FlashcardSet(Base):
     title = Column(String, nullable=False)
     source = Column(String)
     creation_date = Column(DateTime, default=datetime.utcnow)
+    # Monotonic change counter used by the delta sync endpoint
+    version = Column(Integer, nullable=False, default=0, server_default='0')
     flashcards = relationship('Flashcard', back_populates='flashcard_set', cascade='all, delete-orphan')
 
 class Flashcard(Base):
@@ -27,8 +29,31 @@ class Flashcard(Base):
     last_reviewed = Column(DateTime)
     next_review = Column(DateTime)
     review_count = Column(Integer, default=0)
+    # Set version at which this card was last modified
+    updated_version = Column(Integer, nullable=False, default=0, server_default='0')
     flashcard_set = relationship('FlashcardSet', back_populates='flashcards')
 
+    __table_args__ = (
+        Index('ix_flashcards_set_id_updated_version', 'set_id', 'updated_version'),
+    )
+
+# Columns added after the initial schema: create_all() does not alter existing tables
+ADDED_COLUMNS = [
+    ('flashcard_sets', 'version', 'INTEGER NOT NULL DEFAULT 0'),
+    ('flashcards', 'updated_version', 'INTEGER NOT NULL DEFAULT 0'),
+]
+
+def upgrade_schema(engine):
+    """Idempotently add columns and indexes missing from databases created by older versions"""
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table, column, definition in ADDED_COLUMNS:
+            existing = {col['name'] for col in inspector.get_columns(table)}
+            if column not in existing:
+                connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {definition}'))
+        for index in Flashcard.__table__.indexes:
+            index.create(connection, checkfirst=True)
+
 def init_db(database_url=None):
     """Initialize database with the provided URL or from environment variables"""
     if database_url is None:
@@ -40,5 +65,6 @@ def init_db(database_url=None):
         
     engine = create_engine(database_url)
     Base.metadata.create_all(engine)
+    upgrade_schema(engine)
     Session = sessionmaker(bind=engine)
     return Session()
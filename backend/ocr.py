@@ -0,0 +1,274 @@
+import os
+import io
+import math
+import time
+import hashlib
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+from PIL import Image, ImageOps
+from pypdf import PdfReader
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+# Configuration de l'OCR local (Tesseract, aucun appel réseau)
+OCR_LANG = os.getenv('OCR_LANG', 'fra+eng')
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', os.cpu_count() or 1))
+OCR_MAX_DIMENSION = int(os.getenv('OCR_MAX_DIMENSION', 2500))
+OCR_DESKEW_MAX_ANGLE = int(os.getenv('OCR_DESKEW_MAX_ANGLE', 5))
+OCR_TIMEOUT = int(os.getenv('OCR_TIMEOUT', 30))  # Secondes accordées à Tesseract par image
+OCR_TASK_TIMEOUT = int(os.getenv('OCR_TASK_TIMEOUT', 120))  # Secondes par page de PDF ou fichier image
+OCR_CACHE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'ocr_cache')
+OCR_CACHE_MAX_ENTRIES = int(os.getenv('OCR_CACHE_MAX_ENTRIES', 5000))
+OCR_CACHE_MAX_AGE = int(os.getenv('OCR_CACHE_MAX_AGE_DAYS', 30)) * 24 * 3600
+OCR_CACHE_PRUNE_INTERVAL = 600
+
+# Réglages qui influencent le texte reconnu: ils font partie de la clé du cache
+OCR_SETTINGS_KEY = f"v1|{OCR_LANG}|{OCR_MAX_DIMENSION}|{OCR_DESKEW_MAX_ANGLE}"
+
+os.makedirs(OCR_CACHE_FOLDER, exist_ok=True)
+
+_executor = None
+_last_prune = 0.0
+_prune_lock = threading.Lock()
+
+
+def ocr_available():
+    """Indique si un moteur OCR local est utilisable"""
+    if pytesseract is None:
+        return False
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+def _get_executor():
+    """Crée le pool de processus OCR à la première utilisation"""
+    global _executor
+    if _executor is None:
+        # 'spawn': forker un worker Flask multithreadé peut bloquer sur des verrous hérités
+        _executor = ProcessPoolExecutor(
+            max_workers=max(1, OCR_WORKERS),
+            mp_context=multiprocessing.get_context('spawn')
+        )
+        atexit.register(_executor.shutdown, wait=False, cancel_futures=True)
+    return _executor
+
+
+def _cache_key(image_bytes):
+    """Clé de cache: contenu de l'image et réglages OCR"""
+    digest = hashlib.sha256(OCR_SETTINGS_KEY.encode('utf-8'))
+    digest.update(image_bytes)
+    return digest.hexdigest()
+
+
+def _cache_path(image_hash):
+    return os.path.join(OCR_CACHE_FOLDER, f"{image_hash}.txt")
+
+
+def _read_cache(image_hash):
+    path = _cache_path(image_hash)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+    except FileNotFoundError:
+        return None
+    # Rafraîchir la date pour que l'élagage retire d'abord les entrées inutilisées
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return text
+
+
+def _write_cache(image_hash, text):
+    # Écriture atomique pour que deux workers ne lisent jamais un fichier partiel
+    path = _cache_path(image_hash)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def prune_cache():
+    """Retire les entrées expirées puis les plus anciennes au-delà de OCR_CACHE_MAX_ENTRIES"""
+    entries = []
+    expiry = time.time() - OCR_CACHE_MAX_AGE
+    with os.scandir(OCR_CACHE_FOLDER) as scan:
+        for entry in scan:
+            try:
+                mtime = entry.stat().st_mtime
+            except OSError:
+                continue
+            if mtime < expiry:
+                _remove_quietly(entry.path)
+            else:
+                entries.append((mtime, entry.path))
+
+    if len(entries) > OCR_CACHE_MAX_ENTRIES:
+        entries.sort()
+        for _, path in entries[:len(entries) - OCR_CACHE_MAX_ENTRIES]:
+            _remove_quietly(path)
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _maybe_prune_cache():
+    """Élague le cache au plus une fois par OCR_CACHE_PRUNE_INTERVAL secondes"""
+    global _last_prune
+    with _prune_lock:
+        if time.time() - _last_prune < OCR_CACHE_PRUNE_INTERVAL:
+            return
+        _last_prune = time.time()
+    try:
+        prune_cache()
+    except OSError as e:
+        print(f"Erreur lors de l'élagage du cache OCR: {e}")
+
+
+def _skew_score(image):
+    """Variance du profil de projection horizontal (plus élevée quand les lignes sont droites)"""
+    # Réduire à une colonne donne la moyenne de chaque ligne sans numpy
+    profile = list(image.resize((1, image.height), Image.BOX).getdata())
+    mean = sum(profile) / len(profile)
+    return sum((value - mean) ** 2 for value in profile)
+
+
+def deskew(image):
+    """Redresse une image en niveaux de gris en testant de petites rotations"""
+    # Recherche sur une vignette pour limiter le coût
+    thumbnail = image.copy()
+    thumbnail.thumbnail((800, 800))
+    inverted = ImageOps.invert(thumbnail)
+
+    best_angle, best_score = 0, _skew_score(inverted)
+    for angle in range(-OCR_DESKEW_MAX_ANGLE, OCR_DESKEW_MAX_ANGLE + 1):
+        if angle == 0:
+            continue
+        score = _skew_score(inverted.rotate(angle, resample=Image.BILINEAR, expand=True))
+        if score > best_score:
+            best_angle, best_score = angle, score
+
+    if best_angle == 0:
+        return image
+    return image.rotate(best_angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+
+
+def preprocess_image(image):
+    """Prépare une image pour l'OCR: orientation EXIF, réduction, niveaux de gris, redressement"""
+    image = ImageOps.exif_transpose(image)
+    if max(image.size) > OCR_MAX_DIMENSION:
+        image.thumbnail((OCR_MAX_DIMENSION, OCR_MAX_DIMENSION), Image.LANCZOS)
+    image = ImageOps.autocontrast(image.convert('L'))
+    return deskew(image)
+
+
+def _recognize(image_bytes):
+    """Exécute l'OCR sur des octets d'image, en passant par le cache"""
+    image_hash = _cache_key(image_bytes)
+    cached = _read_cache(image_hash)
+    if cached is not None:
+        return cached
+
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        prepared = preprocess_image(image)
+    try:
+        text = pytesseract.image_to_string(prepared, lang=OCR_LANG, timeout=OCR_TIMEOUT).strip()
+    except RuntimeError as e:
+        # pytesseract tue le processus et lève RuntimeError('Tesseract process timeout')
+        if 'timeout' not in str(e).lower():
+            raise
+        print(f"⚠️ Attention: OCR interrompu après {OCR_TIMEOUT} s, image ignorée")
+        return ""  # Pas de mise en cache: un nouvel essai reste possible
+
+    _write_cache(image_hash, text)
+    return text
+
+
+def _ocr_pdf_page(file_path, page_index):
+    """Worker: OCR de toutes les images intégrées dans une page de PDF"""
+    try:
+        deadline = time.monotonic() + OCR_TASK_TIMEOUT
+        page = PdfReader(file_path).pages[page_index]
+        texts = []
+        for image in page.images:
+            if time.monotonic() > deadline:
+                print(f"⚠️ Attention: délai OCR dépassé, images restantes de la page {page_index + 1} ignorées")
+                break
+            texts.append(_recognize(image.data))
+        return "\n".join(text for text in texts if text)
+    except Exception as e:
+        print(f"Erreur OCR sur la page {page_index + 1} de {file_path}: {e}")
+        return ""
+
+
+def _ocr_image_file(file_path):
+    """Worker: OCR d'un fichier image (toutes les pages pour les TIFF/GIF multi-pages)"""
+    try:
+        deadline = time.monotonic() + OCR_TASK_TIMEOUT
+        texts = []
+        with Image.open(file_path) as image:
+            for frame_index in range(getattr(image, 'n_frames', 1)):
+                if time.monotonic() > deadline:
+                    print(f"⚠️ Attention: délai OCR dépassé, pages restantes de {file_path} ignorées")
+                    break
+                image.seek(frame_index)
+                buffer = io.BytesIO()
+                image.save(buffer, format='PNG')
+                texts.append(_recognize(buffer.getvalue()))
+        return "\n".join(text for text in texts if text)
+    except Exception as e:
+        print(f"Erreur OCR sur l'image {file_path}: {e}")
+        return ""
+
+
+def _collect(futures):
+    """
+    Attend les résultats {clé: future} dans une limite proportionnelle au nombre
+    de tâches; une tâche non terminée à temps compte comme une page vide.
+    """
+    rounds = math.ceil(len(futures) / max(1, OCR_WORKERS))
+    # Un tour de plus pour les tâches d'autres requêtes déjà dans le pool
+    done, not_done = wait(futures.values(), timeout=OCR_TASK_TIMEOUT * (rounds + 1))
+    for future in not_done:
+        future.cancel()
+    if not_done:
+        print(f"⚠️ Attention: {len(not_done)} tâche(s) OCR sans résultat dans le délai imparti")
+    return {key: future.result() if future in done else "" for key, future in futures.items()}
+
+
+def ocr_image(file_path):
+    """Extrait le texte d'un fichier image avec l'OCR local"""
+    if not ocr_available():
+        print("⚠️ Attention: Tesseract n'est pas installé, OCR indisponible")
+        return ""
+    text = _collect({file_path: _get_executor().submit(_ocr_image_file, file_path)})[file_path]
+    _maybe_prune_cache()
+    return text
+
+
+def ocr_pdf_pages(file_path, page_indexes):
+    """OCR en parallèle des pages demandées d'un PDF scanné; renvoie {index: texte}"""
+    page_indexes = list(page_indexes)
+    if not page_indexes:
+        return {}
+    if not ocr_available():
+        print("⚠️ Attention: Tesseract n'est pas installé, OCR indisponible")
+        return {}
+
+    executor = _get_executor()
+    futures = {index: executor.submit(_ocr_pdf_page, file_path, index) for index in page_indexes}
+    results = _collect(futures)
+    _maybe_prune_cache()
+    return results
@@ -0,0 +1,159 @@
+import os
+import sys
+import hmac
+import time
+import uuid
+import random
+import threading
+from collections import Counter, deque
+from flask import request, g
+from sqlalchemy import event
+
+# Profilage à la demande: header X-Profile (avec le jeton admin) ou échantillonnage aléatoire
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL_MS', 5)) / 1000
+PROFILE_HISTORY_SIZE = int(os.getenv('PROFILE_HISTORY_SIZE', 200))
+PROFILE_MAX_SQL = 500
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+
+_profiles = deque(maxlen=PROFILE_HISTORY_SIZE)
+_profiles_lock = threading.Lock()
+_local = threading.local()
+
+
+class StackSampler:
+    """Échantillonne la pile d'un thread à intervalle fixe et agrège les piles repliées"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """Sortie au format « pile repliée » (flamegraph.pl, speedscope)"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.counts.most_common())
+
+
+def is_admin_request():
+    """Vérifie le jeton admin; les fonctions d'administration sont désactivées sans ADMIN_TOKEN"""
+    if not ADMIN_TOKEN:
+        return False
+    # Comparaison en temps constant; en octets pour accepter un en-tête non ASCII
+    token = request.headers.get('X-Admin-Token', '')
+    return hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8'))
+
+
+def _should_profile():
+    if request.headers.get('X-Profile') and is_admin_request():
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _start_profile():
+    if not _should_profile():
+        return
+    sampler = StackSampler(threading.get_ident(), PROFILE_INTERVAL)
+    g.profile = {
+        "id": str(uuid.uuid4()),
+        "method": request.method,
+        "path": request.path,
+        "started_at": time.time(),
+        "start": time.perf_counter(),
+        "sampler": sampler,
+        "sql": [],
+    }
+    _local.profile = g.profile
+    sampler.start()
+
+
+def _finish_profile(response):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return response
+    _local.profile = None
+    profile["sampler"].stop()
+
+    sql = profile["sql"]
+    record = {
+        "id": profile["id"],
+        "method": profile["method"],
+        "path": profile["path"],
+        "status": response.status_code,
+        "timestamp": profile["started_at"],
+        "duration_ms": round((time.perf_counter() - profile["start"]) * 1000, 2),
+        "sql_count": len(sql),
+        "sql_ms": round(sum(statement["duration_ms"] for statement in sql), 2),
+        "sql": sql,
+        "collapsed": profile["sampler"].collapsed(),
+    }
+    with _profiles_lock:
+        _profiles.append(record)
+
+    response.headers['X-Profile-Id'] = record["id"]
+    return response
+
+
+def _teardown_profile(exception=None):
+    # Filet de sécurité si after_request n'a pas été appelé (exception non gérée)
+    profile = g.pop('profile', None)
+    if profile is not None:
+        _local.profile = None
+        profile["sampler"].stop()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_local, 'profile', None) is not None:
+        conn.info.setdefault('profile_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = getattr(_local, 'profile', None)
+    if profile is None or not conn.info.get('profile_query_start'):
+        return
+    duration = time.perf_counter() - conn.info['profile_query_start'].pop()
+    if len(profile["sql"]) < PROFILE_MAX_SQL:
+        profile["sql"].append({"statement": statement, "duration_ms": round(duration * 1000, 3)})
+
+
+def init_profiling(app, engine):
+    """Enregistre les hooks de requête Flask et les listeners SQL"""
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.teardown_request(_teardown_profile)
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def get_profiles(limit=20):
+    """Requêtes profilées les plus lentes, sans le détail des piles"""
+    with _profiles_lock:
+        records = sorted(_profiles, key=lambda record: record["duration_ms"], reverse=True)[:limit]
+    return [{key: value for key, value in record.items() if key != "collapsed"} for record in records]
+
+
+def get_profile(profile_id):
+    with _profiles_lock:
+        for record in _profiles:
+            if record["id"] == profile_id:
+                return record
+    return None
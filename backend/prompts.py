@@ -0,0 +1,230 @@
+import os
+import math
+import time
+import threading
+from collections import deque
+from functools import lru_cache
+
+# Budgets de tokens par appel au modèle
+INPUT_TOKEN_BUDGET = int(os.getenv('PROMPT_INPUT_TOKEN_BUDGET', 6000))
+OUTPUT_TOKEN_BUDGET = int(os.getenv('PROMPT_OUTPUT_TOKEN_BUDGET', 4000))
+TOKENS_PER_CARD = int(os.getenv('PROMPT_TOKENS_PER_CARD', 150))
+MAX_NUM_CARDS = int(os.getenv('MAX_NUM_CARDS', 50))
+DEFAULT_NUM_CARDS = 5
+
+# Estimation locale: ~4 caractères par token pour du texte français/anglais
+CHARS_PER_TOKEN = 4
+
+# Marge de sécurité sur la sortie (crochets JSON, espaces)
+OUTPUT_OVERHEAD_TOKENS = 50
+
+# Taille minimale d'une portion de texte quand une génération est répartie sur plusieurs appels
+MIN_SEGMENT_CHARS = 1500
+
+EXISTING_QUESTIONS_HEADER = "\n\nQUESTIONS DÉJÀ CRÉÉES (ne les répète pas et ne les reformule pas):\n"
+
+FLASHCARD_PROMPT_HEADER = """À partir du texte suivant, crée {num_cards} cartes d'apprentissage (flashcards) au format question-réponse.
+
+TEXTE À ANALYSER:
+"""
+
+FLASHCARD_PROMPT_FOOTER = """
+
+INSTRUCTIONS:
+1. Identifie les concepts clés et les informations importantes dans le texte.
+2. Crée exactement {num_cards} cartes avec des questions pertinentes et des réponses précises.
+3. Les questions doivent être claires et spécifiques.
+4. Les réponses doivent être concises mais complètes.
+5. Attribue un niveau de difficulté à chaque carte sur une échelle de 1 à 5 où:
+   - 1 = Très facile (connaissances de base)
+   - 2 = Facile (rappel simple)
+   - 3 = Moyenne (compréhension requise)
+   - 4 = Difficile (application de concepts)
+   - 5 = Très difficile (analyse ou synthèse complexe)
+6. Ta réponse doit être un tableau JSON valide au format suivant:
+
+[
+  {{
+    "question": "Question 1?",
+    "answer": "Réponse 1",
+    "difficulty": 2
+  }},
+  {{
+    "question": "Question 2?",
+    "answer": "Réponse 2",
+    "difficulty": 4
+  }}
+]
+
+Réponds UNIQUEMENT avec le JSON, sans texte explicatif avant ou après."""
+
+
+def estimate_tokens(text):
+    """Estimation locale du nombre de tokens d'un texte (sans appel à l'API)"""
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def normalize_num_cards(value):
+    """Convertit le nombre de cartes demandé par le client et le borne à [1, MAX_NUM_CARDS]"""
+    try:
+        num_cards = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_NUM_CARDS
+    return max(1, min(num_cards, MAX_NUM_CARDS))
+
+
+@lru_cache(maxsize=None)
+def _instructions(num_cards):
+    """Instructions statiques pour un nombre de cartes donné, avec leur coût en tokens"""
+    header = FLASHCARD_PROMPT_HEADER.format(num_cards=num_cards)
+    footer = FLASHCARD_PROMPT_FOOTER.format(num_cards=num_cards)
+    return header, footer, estimate_tokens(header) + estimate_tokens(footer)
+
+
+def cards_per_call():
+    """Nombre maximum de cartes qu'une réponse peut contenir dans le budget de sortie"""
+    return max(1, (OUTPUT_TOKEN_BUDGET - OUTPUT_OVERHEAD_TOKENS) // TOKENS_PER_CARD)
+
+
+def split_num_cards(num_cards):
+    """Répartit les cartes demandées en appels qui tiennent chacun dans le budget de sortie"""
+    per_call = cards_per_call()
+    calls = math.ceil(num_cards / per_call)
+    base, extra = divmod(num_cards, calls)
+    return [base + 1 if i < extra else base for i in range(calls)]
+
+
+def _split_context(text, max_chars, parts):
+    """Répartit le texte en `parts` segments de taille égale (au plus max_chars), coupés sur un espace"""
+    step = min(max_chars, math.ceil(len(text) / parts))
+    segments = []
+    position = 0
+    for i in range(parts):
+        if position >= len(text):
+            break
+        # Le dernier segment absorbe le reste dans la limite du budget
+        end = min(position + (max_chars if i == parts - 1 else step), len(text))
+        if end < len(text):
+            space = text.rfind(' ', position, end)
+            if space > position:
+                end = space
+        segments.append(text[position:end].strip())
+        position = end
+    return [segment for segment in segments if segment] or [""]
+
+
+def plan_flashcard_calls(text, num_cards):
+    """
+    Répartit une génération en appels qui tiennent dans les budgets configurés.
+    Renvoie une liste de (portion du texte, nombre de cartes). Le texte est
+    partagé équitablement entre les appels quand il est assez long; sinon
+    tous les appels reçoivent le même texte (voir build_flashcard_prompt).
+    """
+    counts = split_num_cards(num_cards)
+
+    context_budgets = [INPUT_TOKEN_BUDGET - _instructions(count)[2] for count in counts]
+    max_chars = max(0, min(context_budgets)) * CHARS_PER_TOKEN
+
+    if len(counts) > 1 and len(text) >= len(counts) * MIN_SEGMENT_CHARS:
+        segments = _split_context(text, max_chars, len(counts))
+    else:
+        segments = [text[:max_chars]]
+
+    return [(segments[i % len(segments)], count) for i, count in enumerate(counts)]
+
+
+def build_flashcard_prompt(context, num_cards, existing_questions=()):
+    """
+    Construit le prompt d'un appel. existing_questions liste les questions déjà
+    générées sur le même texte, pour éviter les doublons entre appels.
+    """
+    header, footer, overhead = _instructions(num_cards)
+    prompt_context = context
+
+    if existing_questions:
+        remaining = INPUT_TOKEN_BUDGET - overhead - estimate_tokens(context) - estimate_tokens(EXISTING_QUESTIONS_HEADER)
+        lines = []
+        for question in existing_questions:
+            line = f"- {question}\n"
+            remaining -= estimate_tokens(line)
+            if remaining < 0:
+                break
+            lines.append(line)
+        if lines:
+            prompt_context = context + EXISTING_QUESTIONS_HEADER + "".join(lines).rstrip("\n")
+
+    return header + prompt_context + footer
+
+
+class GenerationUsage:
+    """Comptabilise les tokens et la latence des appels au modèle pour une génération"""
+
+    def __init__(self, label=None):
+        self.label = label
+        self.started_at = time.time()
+        self.calls = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.model_latency = 0.0
+
+    def record_call(self, prompt, response, latency):
+        """Ajoute un appel; utilise les métadonnées d'usage de l'API si disponibles"""
+        usage = getattr(response, 'usage_metadata', None)
+        tokens_in = getattr(usage, 'prompt_token_count', None) if usage else None
+        tokens_out = getattr(usage, 'candidates_token_count', None) if usage else None
+
+        if tokens_in is None:
+            tokens_in = estimate_tokens(prompt)
+        if tokens_out is None:
+            try:
+                tokens_out = estimate_tokens(response.text)
+            except Exception:
+                tokens_out = 0
+
+        self.calls += 1
+        self.tokens_in += tokens_in
+        self.tokens_out += tokens_out
+        self.model_latency += latency
+
+    def finish(self):
+        """Enregistre la génération dans l'historique partagé"""
+        record = {
+            "label": self.label,
+            "timestamp": self.started_at,
+            "calls": self.calls,
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "model_latency_ms": round(self.model_latency * 1000, 1),
+            "total_latency_ms": round((time.time() - self.started_at) * 1000, 1),
+        }
+        with _usage_lock:
+            _usage_history.append(record)
+        print(f"Usage Gemini: {record['calls']} appel(s), {record['tokens_in']} tokens en entrée, "
+              f"{record['tokens_out']} tokens en sortie, {record['model_latency_ms']} ms")
+        return record
+
+
+_usage_history = deque(maxlen=int(os.getenv('USAGE_HISTORY_SIZE', 1000)))
+_usage_lock = threading.Lock()
+
+
+def get_usage_summary():
+    """Historique récent et totaux de consommation de tokens"""
+    with _usage_lock:
+        records = list(_usage_history)
+    return {
+        "budgets": {
+            "input_tokens": INPUT_TOKEN_BUDGET,
+            "output_tokens": OUTPUT_TOKEN_BUDGET,
+            "max_num_cards": MAX_NUM_CARDS,
+        },
+        "totals": {
+            "generations": len(records),
+            "calls": sum(record["calls"] for record in records),
+            "tokens_in": sum(record["tokens_in"] for record in records),
+            "tokens_out": sum(record["tokens_out"] for record in records),
+        },
+        "recent": records,
+    }
@@ -0,0 +1,38 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# db.py lit DATABASE_URL à l'import: la base de test doit être configurée avant
+_workdir = tempfile.mkdtemp(prefix='brainboost-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_workdir, 'test.db')}"
+os.environ.pop('DATABASE_URL_UNPOOLED', None)
+os.environ['GEMINI_API_KEY'] = ''
+os.environ['ADMISSION_ENABLED'] = '0'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from db import db_session, engine, init_db
+from models import Base, FlashcardSet, Flashcard
+
+
+@pytest.fixture
+def client():
+    init_db()
+    yield app_module.app.test_client()
+    db_session.remove()
+    Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def flashcard_set(client):
+    """Jeu de trois cartes; renvoie (set_id, [card_ids])"""
+    flashcard_set = FlashcardSet(id='set-1', title='Jeu de test')
+    for i in range(3):
+        flashcard_set.flashcards.append(Flashcard(
+            id=f'card-{i}', question=f'Question {i}?', answer=f'Réponse {i}', difficulty=1
+        ))
+    db_session.add(flashcard_set)
+    db_session.commit()
+    db_session.remove()
+    return 'set-1', [f'card-{i}' for i in range(3)]
@@ -0,0 +1,114 @@
+import threading
+import time
+import pytest
+from flask import Flask
+import admission
+from admission import InFlightLimiter, InMemoryTokenBucketStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(admission.time, 'monotonic', fake)
+    return fake
+
+
+def test_token_bucket_burst_then_refill(clock):
+    store = InMemoryTokenBucketStore()
+    rate, capacity = 1.0, 3
+
+    assert [store.consume("client", rate, capacity) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert store.consume("client", rate, capacity) == pytest.approx(1.0)
+
+    clock.now += 1.5
+    assert store.consume("client", rate, capacity) == 0.0
+    assert store.consume("client", rate, capacity) == pytest.approx(0.5)
+
+    # Le seau ne dépasse jamais sa capacité
+    clock.now += 100
+    assert [store.consume("client", rate, capacity) for _ in range(4)][-1] > 0
+
+
+def test_token_bucket_keys_are_independent(clock):
+    store = InMemoryTokenBucketStore()
+    assert store.consume("a", 1.0, 1) == 0.0
+    assert store.consume("a", 1.0, 1) > 0
+    assert store.consume("b", 1.0, 1) == 0.0
+
+
+def test_token_bucket_evicts_oldest_clients(clock):
+    store = InMemoryTokenBucketStore(max_keys=2)
+    store.consume("a", 1.0, 1)
+    store.consume("b", 1.0, 1)
+    store.consume("c", 1.0, 1)
+    # "a" a été évincé: son seau repart plein
+    assert store.consume("a", 1.0, 1) == 0.0
+
+
+def test_rejection_sets_retry_after(clock, monkeypatch):
+    monkeypatch.setattr(admission, 'ADMISSION_ENABLED', True)
+    monkeypatch.setitem(admission.LANES, "expensive", dict(admission.LANES["expensive"], rate_per_minute=10, burst=2))
+    monkeypatch.setattr(admission, '_store', None)
+
+    app = Flask(__name__)
+
+    @app.route('/generate', methods=['POST'])
+    @admission.expensive
+    def generate():
+        return "ok"
+
+    admission.init_admission(app)
+    client = app.test_client()
+
+    assert [client.post('/generate').status_code for _ in range(2)] == [200, 200]
+    response = client.post('/generate')
+    assert response.status_code == 429
+    # Un jeton toutes les 6 secondes à 10 requêtes par minute
+    assert response.headers['Retry-After'] == '6'
+    assert response.get_json()["retry_after"] == 6
+
+    clock.now += 6
+    assert client.post('/generate').status_code == 200
+
+
+def test_limiter_rejects_when_queue_full():
+    limiter = InFlightLimiter(max_in_flight=1, queue_size=0, queue_timeout=5)
+    assert limiter.acquire()
+    assert not limiter.acquire()
+    limiter.release()
+    assert limiter.acquire()
+
+
+def test_limiter_times_out():
+    limiter = InFlightLimiter(max_in_flight=1, queue_size=1, queue_timeout=0.05)
+    assert limiter.acquire()
+    started = time.monotonic()
+    assert not limiter.acquire()
+    assert time.monotonic() - started >= 0.05
+    assert limiter.waiting == 0
+
+
+def test_limiter_release_wakes_waiter():
+    limiter = InFlightLimiter(max_in_flight=1, queue_size=1, queue_timeout=5)
+    assert limiter.acquire()
+
+    outcome = {}
+    waiter = threading.Thread(target=lambda: outcome.setdefault("admitted", limiter.acquire()))
+    waiter.start()
+    while limiter.waiting == 0:
+        time.sleep(0.001)
+
+    started = time.monotonic()
+    limiter.release()
+    waiter.join(timeout=5)
+    assert outcome["admitted"] is True
+    assert time.monotonic() - started < 1
+    assert limiter.active == 1
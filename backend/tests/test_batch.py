@@ -0,0 +1,51 @@
+import io
+import os
+import zipfile
+import pytest
+import app as app_module
+
+
+@pytest.fixture
+def fake_generation(monkeypatch):
+    def generate(text, num_cards=5, label=None):
+        return app_module.generate_default_flashcards("Une phrase suffisamment longue pour faire une carte.", num_cards)
+    monkeypatch.setattr(app_module, 'generate_flashcards_from_text', generate)
+
+
+def _zip(names):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name in names:
+            archive.writestr(name, "Contenu du cours sur la photosynthèse.")
+    buffer.seek(0)
+    return buffer
+
+
+def _batch_folders():
+    folder = app_module.app.config['UPLOAD_FOLDER']
+    return {name for name in os.listdir(folder) if os.path.isdir(os.path.join(folder, name))}
+
+
+def test_batch_creates_one_set_per_document(client, fake_generation):
+    before = _batch_folders()
+    response = client.post('/api/upload/batch?num_cards=2', data={
+        "files": [(_zip(["a.txt", "b.txt", "image.exe"]), 'cours.zip'), (io.BytesIO(b"Notes de cours."), 'c.txt')]
+    }, content_type='multipart/form-data')
+
+    data = response.get_json()
+    assert response.status_code == 207
+    assert data["processed"] == 3
+    assert sorted(r["filename"] for r in data["results"] if r["status"] == "success") == ["a.txt", "b.txt", "c.txt"]
+    assert _batch_folders() == before
+
+
+def test_batch_rejects_too_many_files(client, fake_generation, monkeypatch):
+    monkeypatch.setattr(app_module, 'BATCH_MAX_FILES', 2)
+    before = _batch_folders()
+    response = client.post('/api/upload/batch', data={
+        "files": [(_zip(["a.txt", "b.txt", "c.txt"]), 'cours.zip')]
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 400
+    assert "maximum 2" in response.get_json()["error"]
+    assert _batch_folders() == before
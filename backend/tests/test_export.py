@@ -0,0 +1,54 @@
+import csv
+import io
+import pytest
+from db import db_session
+from export import CSV_COLUMNS
+from models import FlashcardSet, Flashcard
+
+
+def test_empty_csv_export_has_header(client):
+    response = client.get('/api/export?format=csv')
+    assert response.status_code == 200
+    assert list(csv.reader(io.StringIO(response.get_data(as_text=True)))) == [CSV_COLUMNS]
+
+
+def test_csv_export_rows(client, flashcard_set):
+    set_id, card_ids = flashcard_set
+    response = client.get(f'/api/flashcards/{set_id}/export?format=csv')
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [row["id"] for row in rows] == card_ids
+    assert rows[0]["answer"] == 'Réponse 0'
+
+
+def test_anki_export_escapes_html(client):
+    flashcard_set = FlashcardSet(id='set-html', title='Balises\tet <b>HTML</b>')
+    flashcard_set.flashcards.append(Flashcard(
+        id='card-html', question='Que vaut 1 < 2 && <b>?', answer='Oui\n<script>x</script>', tags=['a b']
+    ))
+    db_session.add(flashcard_set)
+    db_session.commit()
+    db_session.remove()
+
+    response = client.get('/api/flashcards/set-html/export?format=anki')
+    lines = response.get_data(as_text=True).splitlines()
+    assert '#html:true' in lines
+    question, answer, deck, tags = lines[-1].split('\t')
+    assert question == 'Que vaut 1 &lt; 2 &amp;&amp; &lt;b&gt;?'
+    assert answer == 'Oui<br>&lt;script&gt;x&lt;/script&gt;'
+    assert deck == 'BrainBoost::Balises et <b>HTML</b>'
+    assert tags == 'a_b'
+
+
+@pytest.mark.parametrize("question", ['"Citation" de Hugo?', 'Le mot "quote"', '"'])
+def test_anki_export_quotes_fields(client, question):
+    flashcard_set = FlashcardSet(id='set-quote', title='"Citations"')
+    flashcard_set.flashcards.append(Flashcard(id='card-quote', question=question, answer='Victor Hugo', tags=['litt']))
+    db_session.add(flashcard_set)
+    db_session.commit()
+    db_session.remove()
+
+    response = client.get('/api/flashcards/set-quote/export?format=anki')
+    body = response.get_data(as_text=True)
+    lines = [line for line in body.splitlines() if not line.startswith('#')]
+    fields = next(csv.reader(lines, delimiter='\t'))
+    assert fields == [question, 'Victor Hugo', 'BrainBoost::"Citations"', 'litt']
@@ -0,0 +1,17 @@
+from app import extract_text_from_file
+
+
+def test_txt_utf8(tmp_path):
+    path = tmp_path / 'notes.txt'
+    path.write_bytes('Leçon: théorème de Pythagore'.encode('utf-8'))
+    assert extract_text_from_file(str(path)) == 'Leçon: théorème de Pythagore'
+
+
+def test_txt_latin1_fallback(tmp_path):
+    path = tmp_path / 'notes.txt'
+    path.write_bytes('Leçon: théorème de Pythagore'.encode('latin-1'))
+    assert extract_text_from_file(str(path)) == 'Leçon: théorème de Pythagore'
+
+
+def test_txt_missing_file(tmp_path):
+    assert extract_text_from_file(str(tmp_path / 'absent.txt')) == ""
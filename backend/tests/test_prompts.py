@@ -0,0 +1,67 @@
+import prompts
+from prompts import (
+    EXISTING_QUESTIONS_HEADER, MAX_NUM_CARDS, build_flashcard_prompt, cards_per_call,
+    normalize_num_cards, plan_flashcard_calls, split_num_cards
+)
+
+
+def test_normalize_num_cards_clamps():
+    assert normalize_num_cards(10) == 10
+    assert normalize_num_cards("7") == 7
+    assert normalize_num_cards(0) == 1
+    assert normalize_num_cards(-3) == 1
+    assert normalize_num_cards(MAX_NUM_CARDS + 100) == MAX_NUM_CARDS
+    assert normalize_num_cards(None) == prompts.DEFAULT_NUM_CARDS
+    assert normalize_num_cards("beaucoup") == prompts.DEFAULT_NUM_CARDS
+
+
+def test_split_num_cards_respects_output_budget():
+    per_call = cards_per_call()
+    assert split_num_cards(per_call) == [per_call]
+
+    counts = split_num_cards(per_call * 2 + 1)
+    assert len(counts) == 3
+    assert sum(counts) == per_call * 2 + 1
+    assert max(counts) <= per_call
+    assert max(counts) - min(counts) <= 1
+
+
+def test_plan_single_call_keeps_text():
+    calls = plan_flashcard_calls("Un court texte de cours.", 3)
+    assert calls == [("Un court texte de cours.", 3)]
+
+
+def test_plan_splits_context_across_calls():
+    per_call = cards_per_call()
+    words = [f"mot{i}" for i in range(4000)]
+    text = " ".join(words)
+    calls = plan_flashcard_calls(text, per_call * 3)
+
+    assert len(calls) == 3
+    segments = [segment for segment, _ in calls]
+    assert len(set(segments)) == 3
+    # Segments contigus, de taille comparable, sans couper de mot
+    assert " ".join(segments).split() == words
+    sizes = [len(segment) for segment in segments]
+    assert max(sizes) - min(sizes) < max(sizes) * 0.2
+
+
+def test_plan_reuses_short_text_for_every_call():
+    per_call = cards_per_call()
+    calls = plan_flashcard_calls("Texte trop court pour être partagé.", per_call * 2)
+    assert [segment for segment, _ in calls] == ["Texte trop court pour être partagé."] * 2
+
+
+def test_build_prompt_lists_existing_questions():
+    prompt = build_flashcard_prompt("Contexte.", 4, ["Qu'est-ce que X?", "Pourquoi Y?"])
+    assert "crée 4 cartes" in prompt
+    assert EXISTING_QUESTIONS_HEADER + "- Qu'est-ce que X?\n- Pourquoi Y?" in prompt
+    assert prompt.index("Contexte.") < prompt.index(EXISTING_QUESTIONS_HEADER) < prompt.index("INSTRUCTIONS:")
+
+
+def test_build_prompt_without_existing_questions():
+    assert EXISTING_QUESTIONS_HEADER not in build_flashcard_prompt("Contexte.", 4)
+
+
+def test_generation_metrics_requires_admin(client):
+    assert client.get('/api/metrics/generation').status_code == 403
@@ -0,0 +1,77 @@
+from sqlalchemy import create_engine, inspect, text
+from models import upgrade_schema
+
+
+def sync(client, set_id, **payload):
+    response = client.post(f'/api/flashcards/{set_id}/sync', json=payload)
+    return response.status_code, response.get_json()
+
+
+def test_initial_sync_returns_full_set(client, flashcard_set):
+    set_id, card_ids = flashcard_set
+    status, body = sync(client, set_id)
+    assert status == 200
+    assert body["full"] is True
+    assert body["version"] == 0
+    assert sorted(card["id"] for card in body["cards"]) == card_ids
+
+
+def test_own_events_are_not_echoed(client, flashcard_set):
+    set_id, card_ids = flashcard_set
+    status, body = sync(client, set_id, since=0, events=[{"id": card_ids[0], "reviewCount": 2}])
+    assert status == 200
+    assert body == {"version": 1, "cards": []}
+
+    status, body = sync(client, set_id, since=1)
+    assert body == {"version": 1, "cards": []}
+
+
+def test_edit_from_other_device_is_returned_with_own_event(client, flashcard_set):
+    set_id, card_ids = flashcard_set
+    client.put(f'/api/flashcards/{set_id}/cards/{card_ids[0]}', json={"question": "NEW Q"})
+
+    status, body = sync(client, set_id, since=0, events=[{"id": card_ids[0], "reviewCount": 3}])
+    assert status == 200
+    assert body["version"] == 2
+    assert body["cards"] == [{
+        "id": card_ids[0], "question": "NEW Q", "answer": "Réponse 0", "difficulty": 1, "reviewCount": 3
+    }]
+
+
+def test_invalid_event_is_not_partially_applied(client, flashcard_set):
+    set_id, card_ids = flashcard_set
+    status, body = sync(client, set_id, since=0, events=[
+        {"id": card_ids[0], "reviewCount": 7, "difficulty": "hard"}
+    ])
+    assert status == 200
+    assert body["rejected"] == [card_ids[0]]
+
+    card = next(card for card in client.get(f'/api/flashcards/{set_id}').get_json()["flashcards"]
+                if card["id"] == card_ids[0])
+    assert card["reviewCount"] == 0
+
+
+def test_malformed_payloads_are_rejected(client, flashcard_set):
+    set_id, _ = flashcard_set
+    assert sync(client, set_id, since=True)[0] == 400
+    assert sync(client, set_id, since=-1)[0] == 400
+    assert sync(client, set_id, since=0, events=[{"id": [1]}])[0] == 400
+    assert sync(client, set_id, since=0, events=["card-0"])[0] == 400
+    assert sync(client, 'missing', since=0)[0] == 404
+
+
+def test_upgrade_schema_adds_version_columns(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE flashcard_sets (id VARCHAR PRIMARY KEY, title VARCHAR NOT NULL)"))
+        connection.execute(text("CREATE TABLE flashcards (id VARCHAR PRIMARY KEY, set_id VARCHAR NOT NULL)"))
+        connection.execute(text("INSERT INTO flashcard_sets (id, title) VALUES ('s', 't')"))
+
+    upgrade_schema(engine)
+    upgrade_schema(engine)
+
+    inspector = inspect(engine)
+    assert 'version' in {column['name'] for column in inspector.get_columns('flashcard_sets')}
+    assert 'updated_version' in {column['name'] for column in inspector.get_columns('flashcards')}
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT version FROM flashcard_sets")).scalar() == 0
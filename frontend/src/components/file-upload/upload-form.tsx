@@ -15,6 +15,14 @@ axios.defaults.headers.common['Content-Type'] = 'application/json';
 axios.defaults.headers.common['Accept'] = 'application/json';
 axios.defaults.withCredentials = false;
 
+const ALLOWED_FILE_TYPES = [
+  'application/pdf',
+  'image/png',
+  'image/jpeg',
+  'image/tiff',
+  'text/plain',
+];
+
 type Flashcard = {
   id: string;
   question: string;
@@ -91,16 +99,16 @@ export function FileUploadForm() {
   const handleFileChange = (e: React.ChangeEvent<HTMLInputElement>) => {
     if (e.target.files && e.target.files.length > 0) {
       const selectedFile = e.target.files[0];
-      // Check if file type is allowed (PDF)
+      // Check if file type is allowed (PDF, images, text)
       const fileType = selectedFile.type;
-      if (fileType === 'application/pdf') {
+      if (ALLOWED_FILE_TYPES.includes(fileType)) {
         setFile(selectedFile);
         setUploadStatus({ type: null, message: '' });
       } else {
         setFile(null);
         setUploadStatus({
           type: 'error',
-          message: 'Please upload a PDF file.',
+          message: 'Please upload a PDF, image or text file.',
         });
       }
     }
@@ -123,7 +131,7 @@ export function FileUploadForm() {
         <CardHeader>
           <CardTitle>Upload Study Material</CardTitle>
           <CardDescription>
-            Upload PDFs to automatically generate flashcards (May be faster on your own server)
+            Upload PDFs, scanned notes or images to automatically generate flashcards (May be faster on your own server)
           </CardDescription>
         </CardHeader>
         <CardContent>
@@ -134,7 +142,7 @@ export function FileUploadForm() {
                 type="file"
                 {...register('file', { required: true })}
                 onChange={handleFileChange}
-                accept=".pdf"
+                accept=".pdf,.png,.jpg,.jpeg,.tif,.tiff,.txt"
                 className="cursor-pointer"
                 disabled={isUploading}
               />